@@ -1,13 +1,38 @@
 from django.contrib import admin
-from django.utils.html import format_html
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q
+from django.forms.models import BaseInlineFormSet
+from django.utils.html import escape, format_html
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from .models import DemoSession, CommandLog
 
+# Escaped session change-page URL with a placeholder pk, resolved on first use
+_SESSION_CHANGE_URL = None
+
+
+def _session_change_url(pk):
+    """Build a session change URL without walking the URL resolver per row"""
+    global _SESSION_CHANGE_URL
+    if _SESSION_CHANGE_URL is None:
+        _SESSION_CHANGE_URL = escape(reverse('admin:backend_demosession_change', args=['__pk__']))
+    return _SESSION_CHANGE_URL.replace('__pk__', str(pk))
+
+
+class RecentCommandLogFormSet(BaseInlineFormSet):
+    """Inline formset that only loads the latest recent_limit commands"""
+    # Not max_num: the admin forces that to 0 for inlines without add permission
+    recent_limit = 10
+    
+    def get_queryset(self):
+        if not hasattr(self, '_queryset'):
+            self._queryset = super().get_queryset()[:self.recent_limit]
+        return self._queryset
+
 
 class CommandLogInline(admin.TabularInline):
     """Inline display of commands under sessions"""
     model = CommandLog
+    formset = RecentCommandLogFormSet
     extra = 0
     readonly_fields = ['timestamp', 'processing_time_ms', 'is_ai_response']
     fields = ['timestamp', 'command_text', 'response', 'is_ai_response', 'processing_time_ms']
@@ -16,6 +41,10 @@ class CommandLogInline(admin.TabularInline):
     
     def has_add_permission(self, request, obj=None):
         return False
+    
+    def get_queryset(self, request):
+        """Newest commands first so the formset slice keeps the latest ones"""
+        return super().get_queryset(request).order_by('-timestamp')
 
 
 @admin.register(DemoSession)
@@ -36,7 +65,14 @@ class DemoSessionAdmin(admin.ModelAdmin):
         'ended_at'
     ]
     search_fields = ['session_id']
-    readonly_fields = ['session_id', 'started_at', 'ended_at', 'is_active']
+    readonly_fields = [
+        'session_id', 
+        'started_at', 
+        'ended_at', 
+        'is_active', 
+        'command_count_display', 
+        'duration_display'
+    ]
     ordering = ['-started_at']
     list_per_page = 20
     inlines = [CommandLogInline]
@@ -53,56 +89,57 @@ class DemoSessionAdmin(admin.ModelAdmin):
     
     def session_id_display(self, obj):
         """Display session ID with link to transcript"""
-        return format_html(
-            '<a href="{}">{}</a>',
-            reverse('admin:backend_demosession_change', args=[obj.pk]),
-            str(obj.session_id)[:8] + '...'
-        )
+        # UUIDs have no HTML-special characters, so the cached escaped URL is safe
+        url = _session_change_url(obj.pk)
+        return mark_safe(f'<a href="{url}">{str(obj.session_id)[:8]}...</a>')
     session_id_display.short_description = 'Session ID'
     session_id_display.admin_order_field = 'session_id'
     
     def command_count(self, obj):
         """Display number of commands in session"""
-        count = obj.commands.count()
-        return format_html(
-            '<span style="color: {};">{}</span>',
-            'green' if count > 0 else 'gray',
-            count
-        )
+        count = obj.cmd_count
+        color = 'green' if count > 0 else 'gray'
+        return mark_safe(f'<span style="color: {color};">{count}</span>')
     command_count.short_description = 'Commands'
-    command_count.admin_order_field = 'commands__count'
+    command_count.admin_order_field = 'cmd_count'
     
     def command_count_display(self, obj):
         """Display command count in detail view"""
-        count = obj.commands.count()
-        ai_count = obj.commands.filter(is_ai_response=True).count()
+        count = obj.cmd_count
+        ai_count = obj.ai_count
         dummy_count = count - ai_count
         
-        return format_html(
+        return mark_safe(
             '<div style="margin: 10px 0;">'
-            '<strong>Total Commands:</strong> {}<br>'
-            '<strong>AI Responses:</strong> {}<br>'
-            '<strong>Dummy Responses:</strong> {}'
-            '</div>',
-            count, ai_count, dummy_count
+            f'<strong>Total Commands:</strong> {count}<br>'
+            f'<strong>AI Responses:</strong> {ai_count}<br>'
+            f'<strong>Dummy Responses:</strong> {dummy_count}'
+            '</div>'
         )
     command_count_display.short_description = 'Command Statistics'
     
     def duration_display(self, obj):
         """Display session duration"""
-        if obj.ended_at and obj.started_at:
-            duration = obj.ended_at - obj.started_at
-            minutes = duration.total_seconds() / 60
+        if obj.duration is not None:
+            minutes = obj.duration.total_seconds() / 60
             return f"{minutes:.1f} minutes"
         elif obj.is_active:
             return "Active"
         else:
             return "N/A"
     duration_display.short_description = 'Duration'
+    duration_display.admin_order_field = 'duration'
     
     def get_queryset(self, request):
-        """Optimize queryset with command count"""
-        return super().get_queryset(request).prefetch_related('commands')
+        """Annotate command counts and duration so list rows need no extra work"""
+        return super().get_queryset(request).annotate(
+            cmd_count=Count('commands'),
+            ai_count=Count('commands', filter=Q(commands__is_ai_response=True)),
+            duration=ExpressionWrapper(
+                F('ended_at') - F('started_at'),
+                output_field=DurationField()
+            )
+        )
 
 
 @admin.register(CommandLog)
@@ -135,6 +172,7 @@ class CommandLogAdmin(admin.ModelAdmin):
     ]
     ordering = ['-timestamp']
     list_per_page = 25
+    list_select_related = ('session',)
     
     fieldsets = (
         ('Session Information', {
@@ -152,11 +190,8 @@ class CommandLogAdmin(admin.ModelAdmin):
     def session_link(self, obj):
         """Display session with link"""
         if obj.session:
-            return format_html(
-                '<a href="{}">{}</a>',
-                reverse('admin:backend_demosession_change', args=[obj.session.pk]),
-                str(obj.session.session_id)[:8] + '...'
-            )
+            url = _session_change_url(obj.session_id)
+            return mark_safe(f'<a href="{url}">{str(obj.session.session_id)[:8]}...</a>')
         return "N/A"
     session_link.short_description = 'Session'
     session_link.admin_order_field = 'session__session_id'
@@ -191,11 +226,7 @@ class CommandLogAdmin(admin.ModelAdmin):
         """Display processing time with color coding"""
         if obj.processing_time_ms:
             color = 'green' if obj.processing_time_ms < 1000 else 'orange' if obj.processing_time_ms < 3000 else 'red'
-            return format_html(
-                '<span style="color: {};">{}ms</span>',
-                color,
-                obj.processing_time_ms
-            )
+            return mark_safe(f'<span style="color: {color};">{obj.processing_time_ms}ms</span>')
         return "N/A"
     processing_time_display.short_description = 'Processing Time'
     processing_time_display.admin_order_field = 'processing_time_ms'
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.4 on 2026-10-15 01:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('backend', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='commandlog',
+            index=models.Index(fields=['session', 'timestamp'], name='backend_com_session_14a3bb_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='commandlog',
+            index=models.Index(fields=['is_ai_response', '-timestamp'], name='backend_com_is_ai_r_db57ee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='demosession',
+            index=models.Index(fields=['is_active', '-started_at'], name='backend_dem_is_acti_e4de1d_idx'),
+        ),
+    ]
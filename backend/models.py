@@ -11,6 +11,9 @@ class DemoSession(models.Model):
     
     class Meta:
         ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['is_active', '-started_at']),
+        ]
         verbose_name = "Demo Session"
         verbose_name_plural = "Demo Sessions"
 
@@ -41,6 +44,10 @@ class CommandLog(models.Model):
     
     class Meta:
         ordering = ['timestamp']
+        indexes = [
+            models.Index(fields=['session', 'timestamp']),
+            models.Index(fields=['is_ai_response', '-timestamp']),
+        ]
         verbose_name = "Command Log"
         verbose_name_plural = "Command Logs"
 
@@ -0,0 +1,65 @@
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+class SemanticCache:
+    """In-process nearest-neighbour cache of AI responses, partitioned by screen"""
+
+    def __init__(self, threshold: float = 0.95, ttl: int = 3600,
+                 max_entries: int = 256, max_partitions: int = 512):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_partitions = max_partitions
+        # partition -> [(expires_at, unit vector, response)]; cosine similarity is a dot product
+        self._partitions: Dict[str, List[Tuple[float, List[float], str]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> List[float]:
+        """Scale a vector to unit length"""
+        norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+        return [x / norm for x in vector]
+
+    def lookup(self, partition: str, vector: Sequence[float]) -> Optional[str]:
+        """Return the cached response closest to vector if it clears the threshold"""
+        vector = self._normalize(vector)
+        now = time.monotonic()
+        best_score, best_response = self.threshold, None
+
+        with self._lock:
+            entries = self._partitions.get(partition)
+            if not entries:
+                return None
+
+            # Drop expired entries, then score a snapshot so other requests are not blocked
+            entries[:] = [entry for entry in entries if entry[0] > now]
+            candidates = list(entries)
+
+        for _, cached_vector, response in candidates:
+            score = sum(a * b for a, b in zip(vector, cached_vector))
+            if score >= best_score:
+                best_score, best_response = score, response
+
+        return best_response
+
+    def add(self, partition: str, vector: Sequence[float], response: str) -> None:
+        """Store a response, evicting the oldest entry when the partition is full"""
+        entry = (time.monotonic() + self.ttl, self._normalize(vector), response)
+        with self._lock:
+            entries = self._partitions.get(partition)
+            if entries is None:
+                # Forget the least recently created partition once full
+                if len(self._partitions) >= self.max_partitions:
+                    del self._partitions[next(iter(self._partitions))]
+                entries = self._partitions[partition] = []
+            entries.append(entry)
+            if len(entries) > self.max_entries:
+                del entries[0]
+
+    def clear(self) -> None:
+        """Remove every cached entry"""
+        with self._lock:
+            self._partitions.clear()
@@ -1,25 +1,18 @@
+from collections.abc import Mapping
 from rest_framework import serializers
 from .models import DemoSession, CommandLog
 
 class DemoSessionSerializer(serializers.ModelSerializer):
     """Serializer for demo sessions"""
-    session_id = serializers.UUIDField(read_only=True)
-    started_at = serializers.DateTimeField(read_only=True)
-    ended_at = serializers.DateTimeField(read_only=True)
-    is_active = serializers.BooleanField(read_only=True)
     
     class Meta:
         model = DemoSession
         fields = ['session_id', 'started_at', 'ended_at', 'is_active']
+        read_only_fields = fields
 
 class CommandLogSerializer(serializers.ModelSerializer):
     """Serializer for command logs"""
-    session = serializers.UUIDField(source='session.session_id', read_only=True)
-    timestamp = serializers.DateTimeField(read_only=True)
-    command_text = serializers.CharField(max_length=1000)
-    response = serializers.CharField(read_only=True)
-    is_ai_response = serializers.BooleanField(read_only=True)
-    processing_time_ms = serializers.IntegerField(read_only=True)
+    session = serializers.UUIDField(source='session_id', read_only=True)
     
     class Meta:
         model = CommandLog
@@ -27,18 +20,43 @@ class CommandLogSerializer(serializers.ModelSerializer):
             'id', 'session', 'timestamp', 'command_text', 
             'response', 'is_ai_response', 'processing_time_ms'
         ]
+        read_only_fields = ['timestamp', 'response', 'is_ai_response', 'processing_time_ms']
+        extra_kwargs = {'command_text': {'max_length': 1000}}
 
 class CommandRequestSerializer(serializers.Serializer):
     """Serializer for incoming command requests"""
     session_id = serializers.UUIDField()
     command = serializers.CharField(max_length=1000, min_length=1)
     
+    def to_internal_value(self, data):
+        """Reject blank commands before any field validation runs"""
+        command = data.get('command') if isinstance(data, Mapping) else None
+        if isinstance(command, str) and not command.strip():
+            raise serializers.ValidationError({'command': ["Command cannot be empty"]})
+        return super().to_internal_value(data)
+    
     def validate_command(self, value):
         """Validate command text"""
         if not value or not value.strip():
             raise serializers.ValidationError("Command cannot be empty")
         return value.strip()
 
+class CommandBatchRequestSerializer(serializers.Serializer):
+    """Serializer for incoming batches of command requests"""
+    session_id = serializers.UUIDField()
+    commands = serializers.ListField(
+        child=serializers.CharField(max_length=1000, min_length=1),
+        allow_empty=False,
+        max_length=50  # Bursts of quick commands; AI commands go through send-command
+    )
+
+class AskAIRequestSerializer(serializers.Serializer):
+    """Serializer for incoming AI assistant requests"""
+    user_input = serializers.CharField(max_length=4000, min_length=1)
+    screen_text = serializers.CharField(max_length=100000, required=False, allow_blank=True, default="")
+    session_id = serializers.CharField(required=False, allow_blank=True, default="")
+    stream = serializers.BooleanField(required=False, default=False)
+
 class TranscriptSerializer(serializers.Serializer):
     """Serializer for session transcripts"""
     session_id = serializers.UUIDField()
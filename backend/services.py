@@ -1,13 +1,61 @@
+import atexit
+import re
 import time
+import hashlib
 import logging
-from typing import Tuple, Dict, Any, Optional
+from typing import Tuple, Dict, Any, List, Optional
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.utils import timezone
+import httpx
+from openai import OpenAI
 from .models import DemoSession, CommandLog
 
 logger = logging.getLogger(__name__)
 
+# Keep-alive connection pool so repeated OpenAI calls reuse TCP/TLS connections
+_http_client = httpx.Client(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+    timeout=30.0
+)
+atexit.register(_http_client.close)
+
+# Shared OpenAI client, built once instead of reconfiguring the openai module per call;
+# the client retries transient failures itself, authentication and bad-request errors are not retried
+_client = (
+    OpenAI(
+        api_key=settings.OPENAI_API_KEY,
+        http_client=_http_client,
+        max_retries=getattr(settings, 'OPENAI_MAX_RETRIES', 2)
+    )
+    if getattr(settings, 'OPENAI_API_KEY', None) else None
+)
+
+
+def get_openai_client() -> Optional[OpenAI]:
+    """Return the shared OpenAI client, or None when no API key is configured"""
+    return _client
+
+# Dummy command responses, built once at import
+_HELLO_RESPONSE = "Hello! How can I assist you today?"
+_HELP_RESPONSE = "I can help you with basic commands. Try saying 'hello', 'time', or prefix with 'ai:' for AI responses."
+_FALLBACK_RESPONSE = "I'm not sure how to respond to that yet. Try saying 'help' for available commands."
+
+# Keywords in priority order; only 'time' needs a fresh response per call
+_DUMMY_COMMANDS = (
+    ("hello", lambda: _HELLO_RESPONSE),
+    ("time", lambda: f"The current time is {timezone.now().strftime('%H:%M:%S')}"),
+    ("help", lambda: _HELP_RESPONSE),
+)
+
+# One alternation over every keyword so a command is scanned in a single pass;
+# the lookahead also reports keywords that overlap another match
+_DUMMY_COMMAND_RE = re.compile(
+    "(?=(" + "|".join(re.escape(keyword) for keyword, _ in _DUMMY_COMMANDS) + "))"
+)
+
 class SessionService:
     """Service for managing demo sessions"""
     
@@ -24,19 +72,20 @@ class SessionService:
     
     @staticmethod
     def get_session(session_id: str) -> Optional[DemoSession]:
-        """Get a session by ID"""
+        """Get a session by ID, loading only the fields command handling needs"""
         try:
-            return DemoSession.objects.get(session_id=session_id)
+            return DemoSession.objects.only('session_id', 'is_active').get(session_id=session_id)
         except DemoSession.DoesNotExist:
             logger.warning(f"Session not found: {session_id}")
             return None
     
     @staticmethod
     def end_session(session_id: str) -> bool:
-        """End a session"""
-        session = SessionService.get_session(session_id)
-        if session and session.is_active:
-            session.end_session()
+        """End a session with a single conditional UPDATE"""
+        updated = DemoSession.objects.filter(
+            session_id=session_id, is_active=True
+        ).update(is_active=False, ended_at=timezone.now())
+        if updated:
             logger.info(f"Ended session: {session_id}")
             return True
         return False
@@ -59,22 +108,20 @@ class CommandService:
                 return {"error": "Session has ended"}, 400
             
             # Validate command
-            if not command or not command.strip():
+            command = command.strip() if command else ""
+            if not command:
                 return {"error": "Command cannot be empty"}, 400
             
             # Process command based on type
-            if command.lower().startswith("ai:"):
-                response, is_ai = CommandService._handle_ai_command(command)
-            else:
-                response, is_ai = CommandService._handle_dummy_command(command)
+            response, is_ai = CommandService._dispatch_command(command)
             
             # Calculate processing time
             processing_time = int((time.time() - start_time) * 1000)
             
-            # Log the command
+            # Log the command; a single INSERT is already atomic under autocommit
             CommandLog.objects.create(
                 session=session,
-                command_text=command.strip(),
+                command_text=command,
                 response=response,
                 is_ai_response=is_ai,
                 processing_time_ms=processing_time
@@ -87,47 +134,108 @@ class CommandService:
             logger.error(f"Error processing command: {e}")
             return {"error": "Internal server error"}, 500
     
+    @staticmethod
+    def process_commands(session_id: str, commands: List[str]) -> Tuple[Dict[str, Any], int]:
+        """Process a batch of voice commands and log them with one bulk insert"""
+        try:
+            # Validate session once for the whole batch
+            session = SessionService.get_session(session_id)
+            if not session:
+                return {"error": "Session not found"}, 404
+            
+            if not session.is_active:
+                return {"error": "Session has ended"}, 400
+            
+            # Validate every command before doing any work
+            commands = [command.strip() if command else "" for command in commands]
+            if not commands or not all(commands):
+                return {"error": "Command cannot be empty"}, 400
+            
+            # Each AI command is a blocking OpenAI call, so they are not accepted in bulk
+            if any(command.lower().startswith("ai:") for command in commands):
+                return {"error": "AI commands must be sent one at a time"}, 400
+            
+            logs = []
+            for command in commands:
+                start_time = time.time()
+                response, is_ai = CommandService._dispatch_command(command)
+                logs.append(CommandLog(
+                    session=session,
+                    command_text=command,
+                    response=response,
+                    is_ai_response=is_ai,
+                    processing_time_ms=int((time.time() - start_time) * 1000)
+                ))
+            
+            # Log all commands together
+            with transaction.atomic():
+                CommandLog.objects.bulk_create(logs, batch_size=500)
+            
+            logger.info(f"Processed {len(logs)} commands for session {session_id}")
+            return {"responses": [log.response for log in logs]}, 200
+            
+        except Exception as e:
+            logger.error(f"Error processing commands: {e}")
+            return {"error": "Internal server error"}, 500
+    
+    @staticmethod
+    def _dispatch_command(command: str) -> Tuple[str, bool]:
+        """Route a stripped, non-empty command to its handler"""
+        command_lower = command.lower()
+        if command_lower.startswith("ai:"):
+            return CommandService._handle_ai_command(command)
+        return CommandService._handle_dummy_command(command, command_lower)
+    
     @staticmethod
     def _handle_ai_command(command: str) -> Tuple[str, bool]:
         """Handle AI-powered commands"""
         try:
-            import openai
-            
-            # Get API key from settings
-            api_key = getattr(settings, 'OPENAI_API_KEY', None)
-            if not api_key:
+            if _client is None:
                 return "AI service not configured", False
             
-            openai.api_key = api_key
             prompt = command[3:].strip()  # Remove 'ai:' prefix
             
-            response = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=150,
-                temperature=0.7
-            )
+            # Identical prompts (ignoring case and spacing) reuse the cached completion
+            normalized = " ".join(prompt.lower().split())
+            cache_key = f"ai:{hashlib.sha1(normalized.encode()).hexdigest()}"
+            
+            def complete() -> str:
+                response = _client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=150,
+                    temperature=0.7
+                )
+                return response.choices[0].message.content.strip()
+            
+            try:
+                cached = cache.get(cache_key)
+            except Exception as e:
+                logger.warning(f"AI response cache unavailable: {e}")
+                return complete(), True
+            if cached is not None:
+                return cached, True
             
-            return response.choices[0].message.content.strip(), True
+            response = complete()
+            try:
+                cache.set(cache_key, response, getattr(settings, 'AI_RESPONSE_CACHE_TIMEOUT', 3600))
+            except Exception as e:
+                logger.warning(f"Failed to cache AI response: {e}")
+            return response, True
             
         except Exception as e:
             logger.error(f"AI command processing error: {e}")
             return f"AI service error: {str(e)}", False
     
     @staticmethod
-    def _handle_dummy_command(command: str) -> Tuple[str, bool]:
+    def _handle_dummy_command(command: str, command_lower: str) -> Tuple[str, bool]:
         """Handle dummy commands for testing"""
-        command_lower = command.lower()
-        
-        if "hello" in command_lower:
-            return "Hello! How can I assist you today?", False
-        elif "time" in command_lower:
-            current_time = timezone.now().strftime('%H:%M:%S')
-            return f"The current time is {current_time}", False
-        elif "help" in command_lower:
-            return "I can help you with basic commands. Try saying 'hello', 'time', or prefix with 'ai:' for AI responses.", False
-        else:
-            return "I'm not sure how to respond to that yet. Try saying 'help' for available commands.", False
+        matched = set(_DUMMY_COMMAND_RE.findall(command_lower))
+        if matched:
+            for keyword, respond in _DUMMY_COMMANDS:
+                if keyword in matched:
+                    return respond(), False
+        return _FALLBACK_RESPONSE, False
 
 class TranscriptService:
     """Service for managing session transcripts"""
@@ -136,30 +244,35 @@ class TranscriptService:
     def get_session_transcript(session_id: str) -> Tuple[Dict[str, Any], int]:
         """Get full transcript for a session"""
         try:
-            session = SessionService.get_session(session_id)
+            # The transcript reports every session field, so load the full row
+            session = DemoSession.objects.filter(session_id=session_id).first()
             if not session:
+                logger.warning(f"Session not found: {session_id}")
                 return {"error": "Session not found"}, 404
             
-            commands = session.commands.all()
+            commands = [
+                {
+                    "timestamp": row["timestamp"],
+                    "command": row["command_text"],
+                    "response": row["response"],
+                    "is_ai_response": row["is_ai_response"],
+                    "processing_time_ms": row["processing_time_ms"]
+                }
+                for row in session.commands.values(
+                    'timestamp', 'command_text', 'response',
+                    'is_ai_response', 'processing_time_ms'
+                ).iterator(chunk_size=500)
+            ]
             
             transcript_data = {
                 "session_id": str(session.session_id),
                 "started_at": session.started_at,
                 "ended_at": session.ended_at,
                 "is_active": session.is_active,
-                "total_commands": commands.count(),
-                "commands": []
+                "total_commands": len(commands),
+                "commands": commands
             }
             
-            for cmd in commands:
-                transcript_data["commands"].append({
-                    "timestamp": cmd.timestamp,
-                    "command": cmd.command_text,
-                    "response": cmd.response,
-                    "is_ai_response": cmd.is_ai_response,
-                    "processing_time_ms": cmd.processing_time_ms
-                })
-            
             return transcript_data, 200
             
         except Exception as e:
@@ -1,10 +1,41 @@
-from django.test import TestCase
+from django.contrib import admin
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
+from . import views
+from .admin import RecentCommandLogFormSet
 from .models import DemoSession, CommandLog
+from .serializers import CommandLogSerializer
 from .services import SessionService, CommandService, TranscriptService
+from .semantic_cache import SemanticCache
+from .views import (
+    _LONG_ANSWER_TOKENS,
+    _MEDIUM_ANSWER_TOKENS,
+    _SCREEN_CHAR_LIMIT,
+    _SCREEN_TOKEN_BUDGET,
+    _SHORT_ANSWER_TOKENS,
+    _SYSTEM_PROMPT,
+    _limit_screen_text,
+    _log_ai_interaction,
+    _max_answer_tokens
+)
+import httpx
+import json
+import openai
 import uuid
+from unittest import mock
+
+
+def mock_openai_client(content="It is the dashboard."):
+    """Build a stand-in OpenAI client whose chat completions return content"""
+    client = mock.MagicMock()
+    client.chat.completions.create.return_value.choices = [
+        mock.MagicMock(message=mock.MagicMock(content=content))
+    ]
+    return client
 
 
 class DemoSessionModelTest(TestCase):
@@ -44,6 +75,14 @@ class CommandLogModelTest(TestCase):
         self.assertEqual(command.response, "Hi there!")
         self.assertFalse(command.is_ai_response)
         self.assertEqual(command.processing_time_ms, 100)
+    
+    def test_serializer_reads_session_without_join(self):
+        """Test that serializing a log does not fetch its session"""
+        CommandLog.objects.create(session=self.session, command_text="Hello", response="Hi")
+        command = CommandLog.objects.get()
+        with self.assertNumQueries(0):
+            data = CommandLogSerializer(command).data
+        self.assertEqual(data["session"], str(self.session.session_id))
 
 
 class SessionServiceTest(TestCase):
@@ -74,6 +113,17 @@ class SessionServiceTest(TestCase):
         self.assertTrue(success)
         session.refresh_from_db()
         self.assertFalse(session.is_active)
+        self.assertIsNotNone(session.ended_at)
+    
+    def test_end_session_twice(self):
+        """Test that an ended session cannot be ended again"""
+        session = DemoSession.objects.create()
+        self.assertTrue(SessionService.end_session(str(session.session_id)))
+        self.assertFalse(SessionService.end_session(str(session.session_id)))
+    
+    def test_end_nonexistent_session(self):
+        """Test ending a non-existent session"""
+        self.assertFalse(SessionService.end_session(str(uuid.uuid4())))
 
 
 class CommandServiceTest(TestCase):
@@ -92,6 +142,19 @@ class CommandServiceTest(TestCase):
         self.assertIn("response", result)
         self.assertIn("Hello", result["response"])
     
+    def test_dummy_command_keyword_priority(self):
+        """Test that earlier keywords win when several are present"""
+        result, _ = CommandService.process_command(
+            str(self.session.session_id),
+            "Help me check the TIME"
+        )
+        self.assertIn("current time", result["response"])
+        result, _ = CommandService.process_command(
+            str(self.session.session_id),
+            "something else"
+        )
+        self.assertIn("not sure", result["response"])
+    
     def test_process_empty_command(self):
         """Test processing empty command"""
         result, status_code = CommandService.process_command(
@@ -117,6 +180,74 @@ class CommandServiceTest(TestCase):
         )
         self.assertEqual(status_code, 400)
         self.assertIn("error", result)
+    
+    @mock.patch('backend.services._client', None)
+    def test_process_ai_command_not_configured(self):
+        """Test AI commands when no OpenAI client is configured"""
+        result, status_code = CommandService.process_command(
+            str(self.session.session_id), 
+            "ai: what can you do?"
+        )
+        self.assertEqual(status_code, 200)
+        self.assertEqual(result["response"], "AI service not configured")
+    
+    def test_ai_command_responses_are_cached(self):
+        """Test that repeated AI prompts reuse the cached completion"""
+        cache.clear()
+        client = mock_openai_client(" Cached answer ")
+        with mock.patch('backend.services._client', client):
+            for command in ("ai: What is this?", "AI:  what is   THIS?"):
+                result, status_code = CommandService.process_command(
+                    str(self.session.session_id), 
+                    command
+                )
+                self.assertEqual(result["response"], "Cached answer")
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+    
+    def test_ai_command_survives_cache_outage(self):
+        """Test that AI commands still reach OpenAI when the cache backend is down"""
+        client = mock_openai_client("Direct answer")
+        with mock.patch('backend.services._client', client), \
+                mock.patch('backend.services.cache') as broken_cache:
+            broken_cache.get.side_effect = ConnectionError("cache down")
+            result, status_code = CommandService.process_command(
+                str(self.session.session_id), 
+                "ai: What is this?"
+            )
+        self.assertEqual(status_code, 200)
+        self.assertEqual(result["response"], "Direct answer")
+        self.assertTrue(self.session.commands.get().is_ai_response)
+    
+    def test_process_commands_bulk(self):
+        """Test processing a batch of commands with a single insert"""
+        result, status_code = CommandService.process_commands(
+            str(self.session.session_id), 
+            ["hello", "help"]
+        )
+        self.assertEqual(status_code, 200)
+        self.assertEqual(len(result["responses"]), 2)
+        self.assertIn("Hello", result["responses"][0])
+        self.assertEqual(self.session.commands.count(), 2)
+    
+    def test_process_commands_rejects_empty_command(self):
+        """Test that one empty command rejects the whole batch"""
+        result, status_code = CommandService.process_commands(
+            str(self.session.session_id), 
+            ["hello", "  "]
+        )
+        self.assertEqual(status_code, 400)
+        self.assertEqual(self.session.commands.count(), 0)
+    
+    def test_process_commands_rejects_ai_command(self):
+        """Test that AI commands are kept out of batches"""
+        with mock.patch('backend.services._client') as client:
+            result, status_code = CommandService.process_commands(
+                str(self.session.session_id), 
+                ["hello", "ai: what is this?"]
+            )
+        self.assertEqual(status_code, 400)
+        self.assertFalse(client.chat.completions.create.called)
+        self.assertEqual(self.session.commands.count(), 0)
 
 
 class TranscriptServiceTest(TestCase):
@@ -147,6 +278,13 @@ class TranscriptServiceTest(TestCase):
         self.assertIn("session_id", result)
         self.assertIn("commands", result)
         self.assertEqual(len(result["commands"]), 2)
+        self.assertEqual(result["total_commands"], 2)
+        self.assertEqual(result["commands"][0]["command"], "Hello")
+    
+    def test_transcript_fetches_commands_once(self):
+        """Test that the transcript loads its commands in a single query"""
+        with self.assertNumQueries(2):
+            TranscriptService.get_session_transcript(str(self.session.session_id))
     
     def test_get_nonexistent_transcript(self):
         """Test getting transcript for non-existent session"""
@@ -181,6 +319,46 @@ class APITest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertIn("response", response.data)
     
+    def test_send_commands(self):
+        """Test sending a batch of commands via API"""
+        session = DemoSession.objects.create()
+        
+        url = reverse('send-commands')
+        data = {
+            "session_id": str(session.session_id),
+            "commands": ["hello", "time", "help"]
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["responses"]), 3)
+    
+    def test_send_commands_blank_item(self):
+        """Test that a blank command inside a batch is a validation error"""
+        session = DemoSession.objects.create()
+        
+        url = reverse('send-commands')
+        data = {
+            "session_id": str(session.session_id),
+            "commands": ["hello", ""]
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "Invalid request data")
+        self.assertEqual(session.commands.count(), 0)
+    
+    def test_send_commands_batch_cap(self):
+        """Test that oversized batches are rejected"""
+        session = DemoSession.objects.create()
+        
+        url = reverse('send-commands')
+        data = {
+            "session_id": str(session.session_id),
+            "commands": ["hello"] * 51
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(session.commands.count(), 0)
+    
     def test_send_command_invalid_data(self):
         """Test sending command with invalid data"""
         url = reverse('send-command')
@@ -191,6 +369,18 @@ class APITest(APITestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
     
+    def test_send_blank_command(self):
+        """Test that a blank command is rejected before other validation"""
+        session = DemoSession.objects.create()
+        url = reverse('send-command')
+        data = {
+            "session_id": str(session.session_id),
+            "command": "   "
+        }
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["details"]["command"], ["Command cannot be empty"])
+    
     def test_get_transcript(self):
         """Test getting session transcript via API"""
         session = DemoSession.objects.create()
@@ -215,3 +405,361 @@ class APITest(APITestCase):
         
         session.refresh_from_db()
         self.assertFalse(session.is_active)
+
+
+class AskAITest(APITestCase):
+    """Test the ask_ai endpoint"""
+    
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('ask-ai')
+    
+    def test_empty_user_input(self):
+        """Test that empty user input is rejected"""
+        response = self.client.post(self.url, {"user_input": "  "}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data["error"], "User input is required")
+    
+    def test_null_user_input(self):
+        """Test that a null user input is rejected instead of raising"""
+        response = self.client.post(self.url, {"user_input": None}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("user_input", response.data["details"])
+        self.assertEqual(response.data["error"], "User input is required")
+    
+    def test_oversized_user_input(self):
+        """Test that other validation errors are described to the user"""
+        response = self.client.post(self.url, {"user_input": "x" * 4001}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.data["error"].startswith("Invalid user input:"))
+    
+    def mock_openai(self, content="It is the dashboard."):
+        """Patch the shared OpenAI client with one returning content"""
+        client = mock_openai_client(content)
+        patcher = mock.patch('backend.services._client', client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return client
+    
+    @mock.patch('backend.services._client', None)
+    def test_ai_not_configured(self):
+        """Test that a missing OpenAI client is reported as a configuration error"""
+        response = self.client.post(self.url, {"user_input": "What is this?"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertEqual(response.data["error"], "AI service not configured. Please contact support.")
+    
+    def test_ask_ai(self):
+        """Test a successful AI request"""
+        client = self.mock_openai()
+        response = self.client.post(self.url, {
+            "user_input": "What is this?",
+            "screen_text": "Dashboard"
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["response"], "It is the dashboard.")
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+    
+    def test_static_instructions_in_system_message(self):
+        """Test that only dynamic content is sent in the user message"""
+        client = self.mock_openai()
+        self.client.post(self.url, {
+            "user_input": "What is this?",
+            "screen_text": "Dashboard"
+        }, format='json')
+        system, user = client.chat.completions.create.call_args.kwargs["messages"]
+        self.assertIs(system["content"], _SYSTEM_PROMPT)
+        self.assertIn("Dashboard", user["content"])
+        self.assertNotIn("INSTRUCTIONS", user["content"])
+    
+    def test_streamed_response(self):
+        """Test that stream=true relays the completion as server-sent events"""
+        client = self.mock_openai()
+        client.chat.completions.create.return_value = [
+            mock.MagicMock(choices=[mock.MagicMock(delta=mock.MagicMock(content=piece))])
+            for piece in ("It is ", "the dashboard.")
+        ]
+        session = DemoSession.objects.create()
+        with mock.patch('backend.views._log_executor') as executor:
+            response = self.client.post(self.url, {
+                "user_input": "What is this?",
+                "screen_text": "Dashboard",
+                "session_id": str(session.session_id),
+                "stream": True
+            }, format='json')
+            events = b"".join(response.streaming_content).decode().split("\n\n")
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        self.assertEqual(json.loads(events[0][len("data: "):]), {"delta": "It is "})
+        self.assertEqual(events[2], "data: [DONE]")
+        self.assertTrue(client.chat.completions.create.call_args.kwargs["stream"])
+        executor.submit.assert_called_once_with(
+            _log_ai_interaction, str(session.session_id), "What is this?"
+        )
+    
+    def test_cache_key_separates_question_and_screen(self):
+        """Test that a separator inside the question cannot collide with another screen"""
+        client = self.mock_openai()
+        for user_input, screen_text in (("a|b", "c"), ("a", "b|c")):
+            self.client.post(self.url, {"user_input": user_input, "screen_text": screen_text}, format='json')
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+    
+    def test_truncated_response_not_cached(self):
+        """Test that answers cut off by max_tokens are returned but not cached"""
+        client = self.mock_openai("It is the")
+        client.chat.completions.create.return_value.choices[0].finish_reason = "length"
+        data = {"user_input": "What is this?", "screen_text": "Dashboard"}
+        for _ in range(2):
+            response = self.client.post(self.url, data, format='json')
+            self.assertEqual(response.data["response"], "It is the")
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+    
+    def test_truncated_stream_not_cached(self):
+        """Test that a streamed answer ending on the length limit is not cached"""
+        client = self.mock_openai()
+        client.chat.completions.create.side_effect = lambda **kwargs: [
+            mock.MagicMock(choices=[mock.MagicMock(delta=mock.MagicMock(content="It is the"), finish_reason=None)]),
+            mock.MagicMock(choices=[mock.MagicMock(delta=mock.MagicMock(content=None), finish_reason="length")])
+        ]
+        data = {"user_input": "What is this?", "screen_text": "Dashboard", "stream": True}
+        for _ in range(2):
+            response = self.client.post(self.url, data, format='json')
+            b"".join(response.streaming_content)
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+    
+    def test_log_ai_interaction(self):
+        """Test that the background task records the exchange in the transcript"""
+        session = DemoSession.objects.create()
+        with mock.patch('backend.views.close_old_connections'):
+            _log_ai_interaction(str(session.session_id), "What is this?")
+        self.assertEqual(session.commands.get().command_text, "AI Analysis: What is this?")
+    
+    def test_embeddings_reused_for_identical_questions(self):
+        """Test that the semantic cache embeds a repeated question only once"""
+        client = self.mock_openai()
+        client.embeddings.create.return_value.data = [mock.MagicMock(embedding=[1.0, 0.0])]
+        with mock.patch('backend.views._semantic_cache', SemanticCache()):
+            for screen in ("Dashboard", "Settings"):
+                response = self.client.post(self.url, {
+                    "user_input": "What is this?",
+                    "screen_text": screen
+                }, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(client.embeddings.create.call_count, 1)
+        self.assertEqual(client.chat.completions.create.call_count, 2)
+    
+    def test_semantic_cache_partition_ignores_line_selection(self):
+        """Test that rephrased questions about one long screen share a semantic cache partition"""
+        client = self.mock_openai()
+        client.embeddings.create.return_value.data = [mock.MagicMock(embedding=[1.0, 0.0])]
+        screen = "\n".join(
+            [f"Recent activity entry number {i}" for i in range(100)]
+            + ["Billing: your invoice is overdue", "Profile: your avatar is missing"]
+        )
+        with mock.patch('backend.views._get_encoding', return_value=None), \
+                mock.patch('backend.views._semantic_cache', SemanticCache()):
+            for question in ("Why is my invoice overdue?", "Where is my avatar missing?"):
+                response = self.client.post(self.url, {
+                    "user_input": question,
+                    "screen_text": screen
+                }, format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+    
+    def test_rate_limit_error(self):
+        """Test that OpenAI rate limiting maps to a 429"""
+        client = self.mock_openai()
+        client.chat.completions.create.side_effect = openai.RateLimitError(
+            "Rate limited",
+            response=httpx.Response(429, request=httpx.Request("POST", "https://api.openai.com")),
+            body=None
+        )
+        response = self.client.post(self.url, {"user_input": "What is this?"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    def test_cached_response_skips_openai(self):
+        """Test that a repeated question about the same screen is served from cache"""
+        client = self.mock_openai()
+        for user_input in ("What is this?", "  what is THIS?"):
+            response = self.client.post(self.url, {
+                "user_input": user_input,
+                "screen_text": "Dashboard"
+            }, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data["response"], "It is the dashboard.")
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+
+
+class ScreenTextLimitTest(TestCase):
+    """Test screen text truncation for ask_ai prompts"""
+    
+    def test_truncates_to_token_budget(self):
+        """Test that long screen text is cut to the token budget"""
+        encoding = mock.MagicMock()
+        encoding.encode.side_effect = lambda text, disallowed_special: text.split()
+        encoding.decode.side_effect = " ".join
+        with mock.patch('backend.views._get_encoding', return_value=encoding):
+            text, length = _limit_screen_text("word " * 1000)
+        self.assertEqual(length, _SCREEN_TOKEN_BUDGET)
+        self.assertEqual(len(text.split()), _SCREEN_TOKEN_BUDGET)
+    
+    def test_special_tokens_in_screen_text(self):
+        """Test that screen text containing special-token markers is encoded as plain text"""
+        
+        def encode(text, disallowed_special="all"):
+            if disallowed_special and "<|endoftext|>" in text:
+                raise ValueError("Encountered text corresponding to disallowed special token")
+            return text.split()
+        
+        encoding = mock.MagicMock()
+        encoding.encode.side_effect = encode
+        encoding.decode.side_effect = " ".join
+        with mock.patch('backend.views._get_encoding', return_value=encoding):
+            text, length = _limit_screen_text("<|endoftext|> " * 1000)
+        self.assertEqual(length, _SCREEN_TOKEN_BUDGET)
+        self.assertTrue(text.startswith("<|endoftext|>"))
+    
+    def test_falls_back_to_characters(self):
+        """Test the character cap when no tokenizer is available"""
+        with mock.patch('backend.views._get_encoding', return_value=None):
+            text, length = _limit_screen_text("x" * 5000)
+        self.assertEqual(length, _SCREEN_CHAR_LIMIT)
+        self.assertEqual(text, "x" * _SCREEN_CHAR_LIMIT)
+    
+    def test_keeps_lines_relevant_to_question(self):
+        """Test that oversized screens keep matching lines in their original order"""
+        screen = "\n".join(
+            ["Home Products Pricing Support"] * 50
+            + [f"Recent activity entry number {i}" for i in range(100)]
+            + ["Billing: your invoice is overdue", "Pay now"]
+        )
+        with mock.patch('backend.views._get_encoding', return_value=None):
+            text, length = _limit_screen_text(screen, "Why is my invoice overdue?")
+        lines = text.splitlines()
+        self.assertLessEqual(length, _SCREEN_CHAR_LIMIT)
+        self.assertEqual(length, len(text))
+        self.assertEqual(lines.count("Home Products Pricing Support"), 1)
+        self.assertIn("Billing: your invoice is overdue", lines)
+        self.assertEqual(lines[0], "Home Products Pricing Support")
+    
+    def test_tokenizer_load_retried_after_failure(self):
+        """Test that a failed tokenizer download is retried after the backoff"""
+        encoding = mock.MagicMock()
+        with mock.patch.object(views, '_encoding', None), \
+                mock.patch.object(views, '_encoding_retry_at', 0.0), \
+                mock.patch('backend.views.tiktoken.encoding_for_model',
+                           side_effect=[OSError("network down"), encoding]) as load, \
+                mock.patch('backend.views.time.monotonic', side_effect=[0.0, 0.0, 1.0, 1000.0]):
+            self.assertIsNone(views._get_encoding())
+            self.assertIsNone(views._get_encoding())
+            self.assertIs(views._get_encoding(), encoding)
+            self.assertIs(views._get_encoding(), encoding)
+        self.assertEqual(load.call_count, 2)
+    
+    def test_empty_screen_text(self):
+        """Test the placeholder for missing screen text"""
+        self.assertEqual(_limit_screen_text(""), ("No screen content available", 0))
+    
+    def test_blank_screen_text(self):
+        """Test that whitespace-only screens, even oversized ones, get the placeholder"""
+        with mock.patch('backend.views._get_encoding', return_value=None):
+            self.assertEqual(_limit_screen_text(" " * 2000), ("No screen content available", 0))
+            self.assertEqual(_limit_screen_text("\n \n"), ("No screen content available", 0))
+
+
+
+class AnswerBudgetTest(TestCase):
+    """Test completion length caps for ask_ai"""
+    
+    def test_short_question(self):
+        """Test that short questions get the smallest cap"""
+        self.assertEqual(_max_answer_tokens("Where is settings?"), _SHORT_ANSWER_TOKENS)
+    
+    def test_medium_question(self):
+        """Test that mid-length questions get the medium cap"""
+        question = "Which of these dashboard widgets shows the revenue for this month?"
+        self.assertEqual(_max_answer_tokens(question), _MEDIUM_ANSWER_TOKENS)
+    
+    def test_long_answer_hint(self):
+        """Test that requests for steps keep the full cap even when short"""
+        self.assertEqual(_max_answer_tokens("How do I add a user?"), _LONG_ANSWER_TOKENS)
+        self.assertEqual(_max_answer_tokens("What is on this page?"), _LONG_ANSWER_TOKENS)
+    
+    def test_hints_match_whole_words(self):
+        """Test that hint words inside other words do not lift the cap"""
+        self.assertEqual(_max_answer_tokens("Where's the playlist?"), _SHORT_ANSWER_TOKENS)
+
+
+class SemanticCacheTest(TestCase):
+    """Test SemanticCache lookups"""
+    
+    def setUp(self):
+        self.cache = SemanticCache(threshold=0.95, ttl=60)
+        self.cache.add("screen-a", [1.0, 0.0, 0.0], "Cached answer")
+    
+    def test_similar_vector_hits(self):
+        """Test that a near-identical question returns the cached answer"""
+        self.assertEqual(self.cache.lookup("screen-a", [0.99, 0.05, 0.0]), "Cached answer")
+    
+    def test_dissimilar_vector_misses(self):
+        """Test that an unrelated question misses"""
+        self.assertIsNone(self.cache.lookup("screen-a", [0.0, 1.0, 0.0]))
+    
+    def test_other_screen_misses(self):
+        """Test that answers are not shared across screens"""
+        self.assertIsNone(self.cache.lookup("screen-b", [1.0, 0.0, 0.0]))
+    
+    def test_expired_entries_miss(self):
+        """Test that entries expire after their TTL"""
+        cache = SemanticCache(ttl=0)
+        cache.add("screen-a", [1.0, 0.0], "Stale answer")
+        self.assertIsNone(cache.lookup("screen-a", [1.0, 0.0]))
+
+
+class DemoSessionAdminTest(TestCase):
+    """Test DemoSessionAdmin queryset optimizations"""
+    
+    def setUp(self):
+        self.model_admin = admin.site._registry[DemoSession]
+        self.request = RequestFactory().get('/admin/backend/demosession/')
+        self.session = DemoSession.objects.create()
+        CommandLog.objects.create(session=self.session, command_text="hello", response="Hi", is_ai_response=False)
+        CommandLog.objects.create(session=self.session, command_text="ai: hi", response="Hi", is_ai_response=True)
+    
+    def test_changelist_counts_are_annotated(self):
+        """Test that command counts come from a single annotated query"""
+        with self.assertNumQueries(1):
+            session = self.model_admin.get_queryset(self.request).get(pk=self.session.pk)
+            self.assertEqual(session.cmd_count, 2)
+            self.assertEqual(session.ai_count, 1)
+            self.model_admin.command_count(session)
+            self.model_admin.command_count_display(session)
+    
+    def test_session_link_matches_reverse(self):
+        """Test that the cached change URL matches a fresh reverse()"""
+        expected = reverse('admin:backend_demosession_change', args=[self.session.pk])
+        self.assertIn(f'href="{expected}"', self.model_admin.session_id_display(self.session))
+    
+    def test_duration_is_annotated(self):
+        """Test that session duration is computed by the database"""
+        SessionService.end_session(str(self.session.session_id))
+        session = self.model_admin.get_queryset(self.request).get(pk=self.session.pk)
+        self.assertIsNotNone(session.duration)
+        self.assertTrue(self.model_admin.duration_display(session).endswith("minutes"))
+        
+        active = DemoSession.objects.create()
+        active = self.model_admin.get_queryset(self.request).get(pk=active.pk)
+        self.assertIsNone(active.duration)
+        self.assertEqual(self.model_admin.duration_display(active), "Active")
+    
+    def test_change_view_shows_recent_commands(self):
+        """Test that the session change page renders only the latest commands"""
+        for i in range(15):
+            CommandLog.objects.create(session=self.session, command_text=f"cmd {i}", response="ok")
+        self.client.force_login(User.objects.create_superuser('admin', 'admin@example.com', 'password'))
+        
+        response = self.client.get(reverse('admin:backend_demosession_change', args=[self.session.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Total Commands:</strong> 17")
+        formset = response.context['inline_admin_formsets'][0].formset
+        commands = [form.instance.command_text for form in formset.forms]
+        self.assertEqual(len(commands), RecentCommandLogFormSet.recent_limit)
+        self.assertEqual(commands[0], "cmd 14")
@@ -1,9 +1,10 @@
 from django.urls import path
-from .views import StartSessionView, SendCommandView, TranscriptView, EndSessionView, ask_ai
+from .views import StartSessionView, SendCommandView, SendCommandsView, TranscriptView, EndSessionView, ask_ai
 
 urlpatterns = [
     path('start-session/', StartSessionView.as_view(), name='start-session'),
     path('send-command/', SendCommandView.as_view(), name='send-command'),
+    path('send-commands/', SendCommandsView.as_view(), name='send-commands'),
     path('transcript/<uuid:session_id>/', TranscriptView.as_view(), name='transcript'),
     path('end-session/<uuid:session_id>/', EndSessionView.as_view(), name='end-session'),
     path('ask-ai/', ask_ai, name='ask-ai'),
@@ -1,21 +1,238 @@
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import json
 import logging
 import openai
-import os
+import re
+import tiktoken
+import time
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
 from rest_framework.decorators import api_view
+from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from .services import SessionService, CommandService, TranscriptService
+from django.db import close_old_connections
+from django.http import StreamingHttpResponse
+from .semantic_cache import SemanticCache
+from .services import SessionService, CommandService, TranscriptService, get_openai_client
 from .serializers import (
     DemoSessionSerializer, 
     CommandRequestSerializer, 
+    CommandBatchRequestSerializer,
+    AskAIRequestSerializer,
     TranscriptSerializer
 )
 
 logger = logging.getLogger(__name__)
 
+# Static ask_ai instructions; kept byte-identical across requests so OpenAI can
+# reuse the cached prompt prefix
+_SYSTEM_PROMPT = """You are a helpful, UI-aware AI assistant that guides users through software demos. You can see what's on their screen and provide contextual help.
+
+You are an intelligent AI demo agent helping users interact with a SaaS product UI. You can see what's currently displayed on their screen and should provide helpful, contextual guidance.
+
+Each user message contains the CURRENT SCREEN CONTENT followed by the USER QUESTION/COMMAND.
+
+INSTRUCTIONS:
+1. Analyze the visible screen content to understand the current context
+2. Provide a helpful, specific response that guides the user
+3. If the user asks about features not visible, suggest how to navigate to them
+4. Be conversational but professional
+5. If you can identify specific UI elements, mention them by name
+6. Keep responses concise but informative
+
+RESPONSE FORMAT:
+Provide a natural, helpful response that addresses the user's question based on what's visible on screen.
+"""
+
+# Per-request user message; only the screen content and question vary
+_build_user_prompt = """CURRENT SCREEN CONTENT:
+---
+{screen}
+---
+
+USER QUESTION/COMMAND: "{user}"
+""".format_map
+
+# Screen text sent to the model is capped at this many tokens
+_SCREEN_TOKEN_BUDGET = 500
+# Character cap used when the tokenizer is unavailable (~375 tokens, tighter than the token budget)
+_SCREEN_CHAR_LIMIT = 1500
+
+# Completion length caps; short questions get short answers and return sooner
+_SHORT_ANSWER_TOKENS = 80
+_MEDIUM_ANSWER_TOKENS = 180
+_LONG_ANSWER_TOKENS = 300
+# Whole words asking for enumerated answers or descriptions of the screen, regardless of length
+_LONG_ANSWER_RE = re.compile(
+    r"\b(?:list|steps?|how (?:do|can)|explain|compare|describe|walk me|page|screen)\b",
+    re.IGNORECASE
+)
+
+
+# Loaded tokenizer, and when to retry loading it after a failed download
+_encoding = None
+_encoding_retry_at = 0.0
+_ENCODING_RETRY_SECONDS = 300
+
+
+def _get_encoding():
+    """Load the gpt-3.5-turbo tokenizer once; None while it cannot be loaded"""
+    global _encoding, _encoding_retry_at
+    if _encoding is None and time.monotonic() >= _encoding_retry_at:
+        try:
+            _encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
+        except Exception as e:
+            _encoding_retry_at = time.monotonic() + _ENCODING_RETRY_SECONDS
+            logger.warning(f"Tokenizer unavailable, truncating screen text by characters: {e}")
+    return _encoding
+
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _query_terms(text):
+    """Lowercased words worth matching on, ignoring short filler words"""
+    return {word for word in _WORD_RE.findall(text.lower()) if len(word) > 2}
+
+
+def _encode(encoding, text):
+    """Tokenize screen text, treating special tokens like <|endoftext|> as plain text"""
+    return encoding.encode(text, disallowed_special=())
+
+
+def _text_size(encoding, text):
+    """Size of text in tokens, or in characters without a tokenizer"""
+    return len(text) if encoding is None else len(_encode(encoding, text))
+
+
+def _limit_screen_text(screen_text, user_input=""):
+    """Fit screen text to the prompt budget and return it with its length
+
+    Oversized screens keep the unique lines sharing the most words with the
+    question, in their original order, rather than just the leading lines.
+    """
+    if not screen_text or screen_text.isspace():
+        return "No screen content available", 0
+    
+    encoding = _get_encoding()
+    budget = _SCREEN_CHAR_LIMIT if encoding is None else _SCREEN_TOKEN_BUDGET
+    size = _text_size(encoding, screen_text)
+    if size <= budget:
+        return screen_text, size
+    
+    # Repeated navigation and menu labels only need to appear once
+    lines = list(dict.fromkeys(filter(None, (line.strip() for line in screen_text.splitlines()))))
+    terms = _query_terms(user_input)
+    ranked = sorted(range(len(lines)), key=lambda i: (-len(terms & _query_terms(lines[i])), i))
+    
+    selected, used = [], -1  # no separator before the first line
+    for i in ranked:
+        cost = _text_size(encoding, lines[i]) + 1
+        if used + cost <= budget:
+            selected.append(i)
+            used += cost
+        elif not selected:
+            # A single line larger than the whole budget is cut down to fit
+            line = lines[i]
+            lines[i] = line[:budget] if encoding is None else encoding.decode(_encode(encoding, line)[:budget])
+            selected.append(i)
+            used = budget
+            break
+    
+    return "\n".join(lines[i] for i in sorted(selected)), used
+
+
+def _describe_invalid_request(errors):
+    """Summarize ask_ai validation errors as one message fit to show the user"""
+    if any(error.code in ("required", "blank", "null") for error in errors.get("user_input", [])):
+        return "User input is required"
+    field, details = next(iter(errors.items()))
+    return f"Invalid {field.replace('_', ' ')}: {details[0]}"
+
+
+def _max_answer_tokens(user_input):
+    """Pick a completion length cap from the length and wording of the question"""
+    if _LONG_ANSWER_RE.search(user_input):
+        return _LONG_ANSWER_TOKENS
+    if len(user_input) < 40:
+        return _SHORT_ANSWER_TOKENS
+    if len(user_input) < 120:
+        return _MEDIUM_ANSWER_TOKENS
+    return _LONG_ANSWER_TOKENS
+
+
+# Bounded pool that writes ask_ai interactions off the request path
+_log_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ai-interaction-log")
+
+
+def _log_ai_interaction(session_id, user_input):
+    """Record an ask_ai exchange in the session transcript from a worker thread"""
+    close_old_connections()
+    try:
+        CommandService.process_command(str(session_id), f"AI Analysis: {user_input}")
+    except Exception as e:
+        logger.warning(f"Failed to log AI interaction: {e}")
+    finally:
+        close_old_connections()
+
+
+def _stream_events(pieces, on_complete):
+    """Relay text pieces as server-sent events, then hand the full text to on_complete"""
+    parts = []
+    try:
+        for piece in pieces:
+            if piece:
+                parts.append(piece)
+                yield f"data: {json.dumps({'delta': piece})}\n\n"
+    except Exception as e:
+        logger.error(f"AI response stream interrupted: {e}")
+        yield f"data: {json.dumps({'error': 'Stream interrupted'})}\n\n"
+        return
+    on_complete("".join(parts).strip())
+    yield "data: [DONE]\n\n"
+
+
+def _event_stream_response(pieces, on_complete):
+    """Wrap text pieces in an unbuffered text/event-stream response"""
+    response = StreamingHttpResponse(_stream_events(pieces, on_complete), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+# Near-duplicate question cache for ask_ai; None unless enabled in settings
+_semantic_cache = SemanticCache(
+    threshold=getattr(settings, 'AI_SEMANTIC_CACHE_THRESHOLD', 0.95),
+    ttl=getattr(settings, 'AI_RESPONSE_CACHE_TIMEOUT', 3600)
+) if getattr(settings, 'AI_SEMANTIC_CACHE_ENABLED', False) else None
+
+_EMBEDDING_MODEL = "text-embedding-3-small"
+# Embeddings depend only on the input text, so they can outlive cached responses
+_EMBEDDING_CACHE_TIMEOUT = 86400
+
+
+def _get_embedding(client, text):
+    """Embed text, reusing the vector cached for identical text"""
+    key = f"emb:{_EMBEDDING_MODEL}:" + hashlib.sha256(text.encode()).hexdigest()
+    try:
+        embedding = cache.get(key)
+    except Exception as e:
+        logger.warning(f"Embedding cache unavailable: {e}")
+        embedding = None
+    
+    if embedding is None:
+        embedding = client.embeddings.create(model=_EMBEDDING_MODEL, input=text).data[0].embedding
+        try:
+            cache.set(key, embedding, _EMBEDDING_CACHE_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Failed to cache embedding: {e}")
+    return embedding
+
+
 class StartSessionView(APIView):
     """API endpoint to start a new demo session"""
     permission_classes = [AllowAny]
@@ -78,6 +295,36 @@ class SendCommandView(APIView):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+class SendCommandsView(APIView):
+    """API endpoint to send a burst of voice commands in one request"""
+    permission_classes = [AllowAny]
+    
+    def post(self, request):
+        """Process a batch of voice commands"""
+        try:
+            # Validate request data
+            serializer = CommandBatchRequestSerializer(data=request.data)
+            if not serializer.is_valid():
+                return Response(
+                    {"error": "Invalid request data", "details": serializer.errors}, 
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            session_id = serializer.validated_data['session_id']
+            commands = serializer.validated_data['commands']
+            
+            # Process commands using service
+            result, status_code = CommandService.process_commands(str(session_id), commands)
+            
+            return Response(result, status=status_code)
+            
+        except Exception as e:
+            logger.error(f"Unexpected error in SendCommandsView: {e}")
+            return Response(
+                {"error": "Internal server error"}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
 class TranscriptView(APIView):
     """API endpoint to get session transcript"""
     permission_classes = [AllowAny]
@@ -127,127 +374,170 @@ class EndSessionView(APIView):
 def ask_ai(request):
     """AI endpoint that analyzes screen content and provides contextual responses"""
     try:
-        user_input = request.data.get("user_input", "")
-        screen_text = request.data.get("screen_text", "")
-        session_id = request.data.get("session_id", "")
-
-        # Validate inputs
-        if not user_input.strip():
-            logger.warning("Empty user input received")
+        # Validate request data
+        serializer = AskAIRequestSerializer(data=request.data)
+        if not serializer.is_valid():
+            logger.warning(f"Invalid AI request: {serializer.errors}")
             return Response(
-                {"error": "User input is required"}, 
+                {"error": _describe_invalid_request(serializer.errors), "details": serializer.errors}, 
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Get OpenAI API key from environment
-        openai_api_key = os.environ.get('OPENAI_API_KEY')
-        if not openai_api_key:
+        user_input = serializer.validated_data["user_input"]
+        screen_text = serializer.validated_data["screen_text"]
+        session_id = serializer.validated_data["session_id"]
+        stream = serializer.validated_data["stream"]
+
+        # The shared client is built once at import and is None without an API key
+        client = get_openai_client()
+        if client is None:
             logger.error("OpenAI API key not configured")
             return Response(
                 {"error": "AI service not configured. Please contact support."}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
-        # Configure OpenAI
-        openai.api_key = openai_api_key
-
-        # Limit screen text to prevent token overflow (1500 chars = ~2000 tokens)
-        limited_screen_text = screen_text[:1500] if screen_text else "No screen content available"
+        # Fit screen text to a fixed token budget, keeping the lines relevant to the question
+        limited_screen_text, screen_context_length = _limit_screen_text(screen_text, user_input)
         
-        # Create intelligent prompt based on screen content
-        prompt = f"""
-You are an intelligent AI demo agent helping users interact with a SaaS product UI. You can see what's currently displayed on their screen and should provide helpful, contextual guidance.
+        # Serve repeated questions about the same screen from the response cache
+        cache_key = "askai:" + hashlib.sha256(
+            json.dumps([user_input.lower(), limited_screen_text]).encode()
+        ).hexdigest()
+        try:
+            ai_response = cache.get(cache_key)
+        except Exception as e:
+            logger.warning(f"AI response cache unavailable: {e}")
+            ai_response = None
 
-CURRENT SCREEN CONTENT:
----
-{limited_screen_text}
----
+        # Fall back to the semantic cache for differently phrased questions
+        embedding = None
+        if ai_response is None and _semantic_cache is not None:
+            # Partition by the whole screen: the limited text varies with the question's wording
+            screen_hash = hashlib.sha256(" ".join(screen_text.split()).encode()).hexdigest()
+            try:
+                embedding = _get_embedding(client, user_input)
+                ai_response = _semantic_cache.lookup(screen_hash, embedding)
+            except Exception as e:
+                logger.warning(f"Semantic cache lookup failed: {e}")
 
-USER QUESTION/COMMAND: "{user_input}"
+        def finish(ai_response, store=True):
+            """Cache a new, complete answer and log the interaction"""
+            if not ai_response:
+                return
+            if store:
+                try:
+                    cache.set(cache_key, ai_response, getattr(settings, 'AI_RESPONSE_CACHE_TIMEOUT', 3600))
+                except Exception as e:
+                    logger.warning(f"Failed to cache AI response: {e}")
+                if embedding is not None:
+                    _semantic_cache.add(screen_hash, embedding, ai_response)
+            # Log the interaction if session_id is provided, without delaying the response
+            if session_id:
+                _log_executor.submit(_log_ai_interaction, session_id, user_input)
 
-INSTRUCTIONS:
-1. Analyze the visible screen content to understand the current context
-2. Provide a helpful, specific response that guides the user
-3. If the user asks about features not visible, suggest how to navigate to them
-4. Be conversational but professional
-5. If you can identify specific UI elements, mention them by name
-6. Keep responses concise but informative
+        if ai_response is not None:
+            logger.info(f"Serving cached AI response for: '{user_input[:50]}...'")
+            if stream:
+                return _event_stream_response([ai_response], functools.partial(finish, store=False))
+            finish(ai_response, store=False)
+        else:
+            # Only the dynamic screen content and question go in the user message
+            prompt = _build_user_prompt({"screen": limited_screen_text, "user": user_input})
+            messages = [
+                {
+                    "role": "system", 
+                    "content": _SYSTEM_PROMPT
+                },
+                {
+                    "role": "user", 
+                    "content": prompt
+                }
+            ]
 
-RESPONSE FORMAT:
-Provide a natural, helpful response that addresses the user's question based on what's visible on screen.
-"""
+            logger.info(f"Calling OpenAI API for user input: '{user_input[:50]}...' (screen context length: {screen_context_length})")
 
-        logger.info(f"Calling OpenAI API for user input: '{user_input[:50]}...' (screen text length: {len(limited_screen_text)})")
+            max_tokens = _max_answer_tokens(user_input)
 
-        # Call OpenAI API with error handling
-        try:
-            completion = openai.ChatCompletion.create(
-                model="gpt-3.5-turbo",
-                messages=[
-                    {
-                        "role": "system", 
-                        "content": "You are a helpful, UI-aware AI assistant that guides users through software demos. You can see what's on their screen and provide contextual help."
-                    },
-                    {
-                        "role": "user", 
-                        "content": prompt
-                    }
-                ],
-                max_tokens=300,
-                temperature=0.7
-            )
+            # Call OpenAI API with error handling
+            try:
+                if stream:
+                    # Relay tokens as they are generated instead of waiting for the full completion
+                    chunks = client.chat.completions.create(
+                        model="gpt-3.5-turbo",
+                        messages=messages,
+                        max_tokens=max_tokens,
+                        temperature=0.7,
+                        stream=True
+                    )
+                    finish_reasons = []
+                    
+                    def pieces():
+                        for chunk in chunks:
+                            if chunk.choices:
+                                finish_reasons.append(chunk.choices[0].finish_reason)
+                                yield chunk.choices[0].delta.content
+                    
+                    # Answers cut off by max_tokens are shown but never cached
+                    return _event_stream_response(
+                        pieces(),
+                        lambda text: finish(text, store="length" not in finish_reasons)
+                    )
+
+                completion = client.chat.completions.create(
+                    model="gpt-3.5-turbo",
+                    messages=messages,
+                    max_tokens=max_tokens,
+                    temperature=0.7
+                )
 
-            ai_response = completion.choices[0].message.content.strip()
+                ai_response = completion.choices[0].message.content.strip()
+                truncated = completion.choices[0].finish_reason == "length"
             
-            if not ai_response:
-                logger.warning("Empty response from OpenAI API")
+                if not ai_response:
+                    logger.warning("Empty response from OpenAI API")
+                    return Response({
+                        "response": "I'm sorry, I couldn't generate a response. Please try asking your question again.",
+                        "user_input": user_input,
+                        "screen_context_length": screen_context_length
+                    })
+
+            except openai.RateLimitError as e:
+                logger.error(f"OpenAI rate limit exceeded: {e}")
                 return Response({
-                    "response": "I'm sorry, I couldn't generate a response. Please try asking your question again.",
-                    "user_input": user_input,
-                    "screen_context_length": len(limited_screen_text)
-                })
-
-        except openai.error.RateLimitError as e:
-            logger.error(f"OpenAI rate limit exceeded: {e}")
-            return Response({
-                "response": "I'm receiving too many requests right now. Please wait a moment and try again.",
-                "error": "Rate limit exceeded"
-            }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+                    "response": "I'm receiving too many requests right now. Please wait a moment and try again.",
+                    "error": "Rate limit exceeded"
+                }, status=status.HTTP_429_TOO_MANY_REQUESTS)
             
-        except openai.error.InvalidRequestError as e:
-            logger.error(f"OpenAI invalid request: {e}")
-            return Response({
-                "response": "I'm having trouble processing your request. Please try rephrasing your question.",
-                "error": "Invalid request"
-            }, status=status.HTTP_400_BAD_REQUEST)
+            except openai.BadRequestError as e:
+                logger.error(f"OpenAI invalid request: {e}")
+                return Response({
+                    "response": "I'm having trouble processing your request. Please try rephrasing your question.",
+                    "error": "Invalid request"
+                }, status=status.HTTP_400_BAD_REQUEST)
             
-        except openai.error.AuthenticationError as e:
-            logger.error(f"OpenAI authentication error: {e}")
-            return Response({
-                "response": "AI service is currently unavailable. Please contact support.",
-                "error": "Authentication failed"
-            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+            except openai.AuthenticationError as e:
+                logger.error(f"OpenAI authentication error: {e}")
+                return Response({
+                    "response": "AI service is currently unavailable. Please contact support.",
+                    "error": "Authentication failed"
+                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             
-        except openai.error.APIError as e:
-            logger.error(f"OpenAI API error: {e}")
-            return Response({
-                "response": "I'm experiencing technical difficulties. Please try again in a moment.",
-                "error": "API error"
-            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
-
-        # Log the interaction if session_id is provided
-        if session_id:
-            try:
-                CommandService.process_command(str(session_id), f"AI Analysis: {user_input}")
-            except Exception as e:
-                logger.warning(f"Failed to log AI interaction: {e}")
+            except openai.APIError as e:
+                logger.error(f"OpenAI API error: {e}")
+                return Response({
+                    "response": "I'm experiencing technical difficulties. Please try again in a moment.",
+                    "error": "API error"
+                }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+            finish(ai_response, store=not truncated)
 
         logger.info(f"AI response generated successfully for: '{user_input[:50]}...'")
         
         return Response({
             "response": ai_response,
             "user_input": user_input,
-            "screen_context_length": len(limited_screen_text)
+            "screen_context_length": screen_context_length
         })
 
     except Exception as e:
@@ -35,6 +35,16 @@ ALLOWED_HOSTS = os.environ.get('ALLOWED_HOSTS', 'localhost,127.0.0.1').split(','
 # OpenAI Configuration
 OPENAI_API_KEY = os.environ.get('OPENAI_API_KEY', '')
 
+# Retries for transient OpenAI failures (connection errors, 408/409/429/5xx) with exponential backoff
+OPENAI_MAX_RETRIES = int(os.environ.get('OPENAI_MAX_RETRIES', '2'))
+
+# Seconds an AI response stays cached for an identical prompt
+AI_RESPONSE_CACHE_TIMEOUT = int(os.environ.get('AI_RESPONSE_CACHE_TIMEOUT', '3600'))
+
+# Reuse answers to near-duplicate questions about the same screen (costs one embedding call per miss)
+AI_SEMANTIC_CACHE_ENABLED = os.environ.get('AI_SEMANTIC_CACHE_ENABLED', 'False').lower() == 'true'
+AI_SEMANTIC_CACHE_THRESHOLD = float(os.environ.get('AI_SEMANTIC_CACHE_THRESHOLD', '0.95'))
+
 # Application definition
 
 INSTALLED_APPS = [
@@ -92,6 +102,29 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Per-process LRU memory cache by default; set REDIS_URL to share it across workers
+# (RedisCache needs the redis package from requirements.txt)
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {
+                'MAX_ENTRIES': 2048,
+            },
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -36,10 +36,8 @@ const DemoPage = () => {
   // Function to get visible screen text for AI analysis
   const getScreenContext = () => {
     try {
-      // Get all visible text from the current page
-      const screenText = document.body.innerText || document.body.textContent || '';
-      // Limit to 1500 characters to stay within token limits and prevent overflow
-      return screenText.slice(0, 1500);
+      // Get all visible text from the current page; the server trims it to the token budget
+      return document.body.innerText || document.body.textContent || '';
     } catch (error) {
       console.error('Error getting screen context:', error);
       return '';
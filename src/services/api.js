@@ -95,8 +95,9 @@ export const aiService = {
         throw new Error('User input is required')
       }
 
-      // Limit screen text to prevent token overflow
-      const limitedScreenText = screenText ? screenText.slice(0, 1500) : ''
+      // The server picks the lines relevant to the question within its token budget,
+      // so only cap the payload at the size the API accepts
+      const limitedScreenText = screenText ? screenText.slice(0, 100000) : ''
       
       const response = await api.post('/ask-ai/', {
         user_input: userInput.trim(),
@@ -7,6 +7,10 @@ import requests
 import json
 import os
 
+# Shared session so repeated requests reuse pooled keep-alive connections
+SESSION = requests.Session()
+SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20))
+
 def test_ai_endpoint():
     """Test the AI analysis endpoint"""
     
@@ -29,7 +33,7 @@ def test_ai_endpoint():
     
     try:
         # Make request to AI endpoint
-        response = requests.post(
+        response = SESSION.post(
             "http://localhost:8000/api/backend/ask-ai/",
             json=test_data,
             headers={"Content-Type": "application/json"}